@@ -6,11 +6,16 @@ Provides Telegram messaging capabilities to Claude Code CLI via MCP
 import asyncio
 import logging
 import os
+import random
+import socket
+import time
 from typing import Any
 from mcp.server import Server
+from mcp.server.stdio import stdio_server
 from mcp.types import Tool, TextContent
 from telegram import Bot
-from telegram.error import TelegramError
+from telegram.error import BadRequest, NetworkError, RetryAfter, TelegramError, TimedOut
+from telegram.request import HTTPXRequest
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -22,6 +27,70 @@ app = Server("telegram-sender")
 # Telegram bot instance
 bot: Bot | None = None
 
+# Telegram caps messages at 4096 characters
+MAX_MESSAGE_LENGTH = 4096
+
+# Static response strings, built once instead of per call
+MISSING_ARGS_ERROR = "Error: chat_id and text are required"
+NO_MESSAGES_TEXT = "No recent messages"
+MESSAGES_HEADER = "Recent messages:\n\n"
+
+
+def _chunk(text: str, size: int = MAX_MESSAGE_LENGTH) -> list[str]:
+    """Split text into chunks of at most `size` characters in a single pass"""
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+# Retry policy for transient Telegram failures
+RETRY_ATTEMPTS = 3
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 15.0
+
+
+# Circuit breaker: after repeated network failures, fail fast for a
+# cooldown period instead of letting every call wait out the full timeout
+CIRCUIT_FAILURE_THRESHOLD = 5
+CIRCUIT_COOLDOWN = 30.0
+CIRCUIT_OPEN_ERROR = "Error: Telegram API unreachable, circuit open - try again shortly"
+_failures = 0
+_open_until = 0.0
+
+
+def _circuit_open() -> bool:
+    return time.monotonic() < _open_until
+
+
+def _record_failure() -> None:
+    global _failures, _open_until
+    _failures += 1
+    if _failures >= CIRCUIT_FAILURE_THRESHOLD:
+        _open_until = time.monotonic() + CIRCUIT_COOLDOWN
+        _failures = 0
+        logger.warning(f"Telegram circuit opened for {CIRCUIT_COOLDOWN:.0f}s after repeated network failures")
+
+
+def _record_success() -> None:
+    global _failures
+    _failures = 0
+
+
+async def _call_with_retry(method, **kwargs):
+    """Call a bot API method, retrying rate limits and timeouts with jittered backoff"""
+    for attempt in range(RETRY_ATTEMPTS):
+        try:
+            return await method(**kwargs)
+        except RetryAfter as e:
+            if attempt == RETRY_ATTEMPTS - 1:
+                raise
+            # Telegram tells us exactly how long to wait
+            await asyncio.sleep(e.retry_after)
+        except TimedOut:
+            if attempt == RETRY_ATTEMPTS - 1:
+                raise
+            # Jitter the exponential delay so concurrent retries don't re-collide
+            delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt)
+            await asyncio.sleep(random.uniform(delay * 0.5, delay * 1.5))
+
 
 def get_bot() -> Bot:
     """Get or create Telegram bot instance"""
@@ -30,7 +99,30 @@ def get_bot() -> Bot:
         token = os.getenv("TELEGRAM_BOT_TOKEN")
         if not token:
             raise ValueError("TELEGRAM_BOT_TOKEN environment variable is required")
-        bot = Bot(token=token)
+        # Separate HTTPX pools so the get_updates long-poll can never
+        # occupy the connections used for outbound sends
+        pool_size = int(os.getenv("TG_POOL_SIZE", "32"))
+        poll_pool_size = int(os.getenv("TG_POLL_POOL_SIZE", "4"))
+        # "2" multiplexes concurrent sends over one connection; needs httpx[http2]
+        http_version = os.getenv("TG_HTTP_VERSION", "1.1")
+        # Disable Nagle's algorithm: API calls are small writes that should
+        # go on the wire immediately instead of waiting to be batched
+        socket_options = ((socket.IPPROTO_TCP, socket.TCP_NODELAY, 1),)
+        bot = Bot(
+            token=token,
+            request=HTTPXRequest(
+                connection_pool_size=pool_size,
+                pool_timeout=10.0,
+                http_version=http_version,
+                socket_options=socket_options,
+            ),
+            get_updates_request=HTTPXRequest(
+                connection_pool_size=poll_pool_size,
+                pool_timeout=10.0,
+                http_version=http_version,
+                socket_options=socket_options,
+            ),
+        )
     return bot
 
 
@@ -40,14 +132,43 @@ async def send_message(arguments: dict) -> list[TextContent]:
     text = arguments.get("text")
 
     if not chat_id or not text:
-        return [TextContent(type="text", text="Error: chat_id and text are required")]
+        return [TextContent(type="text", text=MISSING_ARGS_ERROR)]
+
+    if _circuit_open():
+        return [TextContent(type="text", text=CIRCUIT_OPEN_ERROR)]
 
     try:
         telegram_bot = get_bot()
-        message = await telegram_bot.send_message(chat_id=chat_id, text=text)
+        if len(text) <= MAX_MESSAGE_LENGTH:
+            message = await _call_with_retry(telegram_bot.send_message, chat_id=chat_id, text=text)
+            _record_success()
 
-        result = f"Message sent successfully!\nChat ID: {message.chat_id}\nMessage ID: {message.message_id}"
+            result = f"Message sent successfully!\nChat ID: {message.chat_id}\nMessage ID: {message.message_id}"
+            return [TextContent(type="text", text=result)]
+
+        # Text exceeds the Telegram limit: split it up and send the parts
+        # sequentially so they arrive in order, each labelled for reassembly.
+        # The smaller chunk size leaves room for the "[i/total] " prefix.
+        chunks = _chunk(text, MAX_MESSAGE_LENGTH - 16)
+        total = len(chunks)
+        messages = []
+        for i, chunk in enumerate(chunks):
+            message = await _call_with_retry(
+                telegram_bot.send_message, chat_id=chat_id, text=f"[{i + 1}/{total}] {chunk}"
+            )
+            messages.append(message)
+        _record_success()
+
+        result = f"Message sent successfully in {len(messages)} parts!\nChat ID: {messages[0].chat_id}\n"
+        result += f"Message IDs: {', '.join(str(m.message_id) for m in messages)}"
         return [TextContent(type="text", text=result)]
+    except BadRequest as e:
+        # Caller errors (bad chat_id etc.) subclass NetworkError but must
+        # not trip the circuit breaker
+        return [TextContent(type="text", text=f"Telegram error: {str(e)}")]
+    except NetworkError as e:
+        _record_failure()
+        return [TextContent(type="text", text=f"Telegram error: {str(e)}")]
     except TelegramError as e:
         return [TextContent(type="text", text=f"Telegram error: {str(e)}")]
 
@@ -56,89 +177,125 @@ async def get_updates(arguments: dict) -> list[TextContent]:
     """Get recent updates from Telegram"""
     limit = arguments.get("limit", 10)
 
+    if _circuit_open():
+        return [TextContent(type="text", text=CIRCUIT_OPEN_ERROR)]
+
     try:
         telegram_bot = get_bot()
         updates = await telegram_bot.get_updates(limit=limit)
+        _record_success()
 
         if not updates:
-            return [TextContent(type="text", text="No recent messages")]
-
-        result = "Recent messages:\n\n"
-        for update in updates[-limit:]:
-            if update.message:
-                msg = update.message
-                username = msg.from_user.username if msg.from_user.username else "N/A"
-                result += f"From: {msg.from_user.first_name} (@{username})\n"
-                result += f"Chat ID: {msg.chat_id}\n"
-                result += f"Text: {msg.text}\n"
-                result += f"Date: {msg.date}\n\n"
+            return [TextContent(type="text", text=NO_MESSAGES_TEXT)]
 
-        return [TextContent(type="text", text=result)]
+        parts = [MESSAGES_HEADER]
+        for update in updates:
+            msg = update.message
+            if msg is None:
+                continue
+            user = msg.from_user
+            username = user.username if user.username else "N/A"
+            parts.append(
+                f"From: {user.first_name} (@{username})\n"
+                f"Chat ID: {msg.chat_id}\n"
+                f"Text: {msg.text}\n"
+                f"Date: {msg.date}\n\n"
+            )
+
+        return [TextContent(type="text", text="".join(parts))]
+    except BadRequest as e:
+        return [TextContent(type="text", text=f"Telegram error: {str(e)}")]
+    except NetworkError as e:
+        _record_failure()
+        return [TextContent(type="text", text=f"Telegram error: {str(e)}")]
     except TelegramError as e:
         return [TextContent(type="text", text=f"Telegram error: {str(e)}")]
 
 
-@app.list_tools()
-async def list_tools() -> list[Tool]:
-    """List available Telegram tools"""
-    return [
-        Tool(
-            name="send_telegram_message",
-            description="Send a message to a Telegram chat",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "chat_id": {
-                        "type": "string",
-                        "description": "Telegram chat ID or username (e.g., '@myautomaticagentbot')"
-                    },
-                    "text": {
-                        "type": "string",
-                        "description": "Message text to send"
-                    }
+# Tool definitions are static, so build them once at import time
+_TOOLS = [
+    Tool(
+        name="send_telegram_message",
+        description="Send a message to a Telegram chat",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "chat_id": {
+                    "type": "string",
+                    "description": "Telegram chat ID or username (e.g., '@myautomaticagentbot')"
                 },
-                "required": ["chat_id", "text"]
-            }
-        ),
-        Tool(
-            name="get_telegram_updates",
-            description="Get recent messages from Telegram bot",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "limit": {
-                        "type": "number",
-                        "description": "Number of updates to retrieve (default: 10)",
-                        "default": 10
-                    }
+                "text": {
+                    "type": "string",
+                    "description": "Message text to send"
+                }
+            },
+            "required": ["chat_id", "text"]
+        }
+    ),
+    Tool(
+        name="get_telegram_updates",
+        description="Get recent messages from Telegram bot",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "limit": {
+                    "type": "number",
+                    "description": "Number of updates to retrieve (default: 10)",
+                    "default": 10
                 }
             }
-        )
-    ]
+        }
+    )
+]
+
+_DISPATCH = {
+    "send_telegram_message": send_message,
+    "get_telegram_updates": get_updates,
+}
+
+
+@app.list_tools()
+async def list_tools() -> list[Tool]:
+    """List available Telegram tools"""
+    return _TOOLS
 
 
 @app.call_tool()
 async def call_tool(name: str, arguments: Any) -> list[TextContent]:
     """Handle tool calls"""
     try:
-        if name == "send_telegram_message":
-            return await send_message(arguments)
-        elif name == "get_telegram_updates":
-            return await get_updates(arguments)
-        else:
+        handler = _DISPATCH.get(name)
+        if handler is None:
             raise ValueError(f"Unknown tool: {name}")
+        return await handler(arguments)
     except Exception as e:
         logger.error(f"Error calling tool {name}: {e}")
         return [TextContent(type="text", text=f"Error: {str(e)}")]
 
 
+async def _warmup():
+    """Open a warm Telegram connection so the first tool call skips DNS + TLS setup"""
+    try:
+        me = await get_bot().get_me()
+        logger.info(f"Telegram connection warmed up as @{me.username}")
+    except Exception as e:
+        logger.warning(f"Telegram warmup failed: {e}")
+
+
 async def main():
     """Run the MCP server"""
-    from mcp.server.stdio import stdio_server
-
-    async with stdio_server() as (read_stream, write_stream):
-        await app.run(read_stream, write_stream, app.create_initialization_options())
+    warmup_task = asyncio.create_task(_warmup())
+    try:
+        async with stdio_server() as (read_stream, write_stream):
+            await app.run(read_stream, write_stream, app.create_initialization_options())
+    finally:
+        warmup_task.cancel()
 
 
 if __name__ == "__main__":
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
     asyncio.run(main())